@@ -7,18 +7,132 @@ Author: Chunliang Mu
 """
 
 
-from .log import say, is_verbose
+from .log import say, is_verbose, LEVEL_FATAL, LEVEL_ERR, LEVEL_WARN, LEVEL_NOTE, LEVEL_INFO
 from .io import json_dump, json_load, JSONDecodeError
 
 import logging
 import os
+import sys
+import platform
+import ctypes
+import struct
+import errno
 from os.path import sep
+import stat
 import shutil
-import filecmp
-from datetime import datetime, UTC
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, Future
+import threading
+from datetime import datetime, timedelta, UTC
 import time
+import math
+from functools import lru_cache
+from operator import itemgetter
+import subprocess
+try:
+    import fcntl    # not available on windows
+except ImportError:
+    fcntl = None
+import mmap
+import zlib
 import gzip
-import numpy as np
+import tarfile
+import hashlib
+
+#  import (optional, faster gzip implementations)
+try:
+    from isal import igzip as _igzip
+except ImportError:
+    _igzip = None
+try:
+    import deflate as _libdeflate
+except ImportError:
+    _libdeflate = None
+#  import (optional, multi-threaded gzip compression)
+_PIGZ_PATH: None|str = shutil.which('pigz')
+_TAR_PATH : None|str = shutil.which('tar')
+try:
+    from isal import igzip_threaded as _igzip_threaded
+except ImportError:
+    _igzip_threaded = None
+try:
+    import mgzip
+except ImportError:
+    mgzip = None
+#  import (optional, zstd compression)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+#  import (optional, fast hashing)
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+
+# files larger than this (in bytes) will be gzip-ed by streaming instead of in one go, to bound memory usage
+GZIP_INMEM_MAXSIZE: int = 256 * 1024**2
+# isal (ISA-L) only supports compression levels up to this
+_ISAL_MAX_LEVEL: int = 3
+# files larger than this (in bytes) will be gzip-ed with multiple threads (via pigz, isal or mgzip), if available
+GZIP_PARALLEL_MINSIZE: int = 16 * 1024**2
+
+# keys that must be in each entry of the new / old filetree, for _backup_sub()
+_FILETREE_REQUIRED_KEYS    : frozenset[str] = frozenset({'type', 'no_f', 'size', 'compr_mth', 'mtime_px6', 'mtime_utc'})
+_FILETREE_REQUIRED_KEYS_OLD: frozenset[str] = frozenset({'type', 'size', 'mtime_px6'})
+
+# recognized values of the action argument of _save_bkp_file()
+_COPY_ACTIONS: frozenset[str] = frozenset({'copy', 'Copy', 'cp', 'move', 'Move', 'mv'})
+
+# buffer size for copying files through userspace, and chunk size per in-kernel copy call
+COPY_BUFSIZE: int = 1024**2
+_KERNEL_COPY_CHUNKSIZE: int = 1024**3
+
+# hash method for comparing file contents (when filecmp_shallow=False)- fastest available
+HASH_METHOD: str = 'blake3' if blake3 is not None else 'xxh3_128' if xxhash is not None else 'blake2b'
+
+# default compression method for backup files- zstd if available
+DEFAULT_COMPRESS: str = 'zstd' if zstandard is not None else 'gzip'
+
+# default names of dirs to archive as a whole / to ignore (immutable, as they are shared default arguments)
+DEFAULT_GZTAR_LIST : frozenset[str] = frozenset({'.git'})
+DEFAULT_IGNORE_LIST: frozenset[str] = frozenset({'__pycache__', '.ipynb_checkpoints'})
+
+# whether to scan dirs in inode order by default- not on windows,
+#    where DirEntry.inode() costs a stat call per entry and NTFS file IDs say nothing about disk location
+DEFAULT_SORT_BY_INODE: bool = os.name != 'nt'
+
+# thread pool for scanning directories & copying files in parallel (syscall / zlib-bound, which release the GIL)
+#    created on first use by _get_executor().
+#    scanning only uses it for directories with more than PARALLEL_MIN_ENTRIES entries, to avoid overhead on tiny dirs,
+#    and only in the top PARALLEL_MAX_DEPTH levels, to avoid task explosion on deeply nested trees
+_EXECUTOR: None|ThreadPoolExecutor = None
+_EXECUTOR_LOCK = threading.Lock()
+PARALLEL_MIN_ENTRIES: int = 4
+PARALLEL_MAX_DEPTH  : int = 2
+#    no of threads in the pool (set before the first backup to change it)-
+#    heavily oversubscribed, as both scanning & copying mostly wait on the filesystem
+PARALLEL_MAX_WORKERS: int = min(32, (os.cpu_count() or 1)*4)
+# process pool for compressing files (optional; see backup(use_processes=...))
+#    for when compression is CPU-bound in python code holding the GIL. Created on first use by _get_process_executor().
+_PROCESS_EXECUTOR: None|ProcessPoolExecutor = None
+
+# Linux only: read huge directories via getdents64 directly with a big buffer
+#    (only for dirs whose own size is at least FAST_LISTDIR_MINSIZE bytes, i.e. with lots of entries)
+_SYS_GETDENTS64: None|int = {'x86_64': 217, 'aarch64': 61, 'arm64': 61}.get(platform.machine())
+_libc = None
+if sys.platform.startswith('linux') and _SYS_GETDENTS64 is not None:
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        pass
+FAST_LISTDIR_BUFSIZE: int = 1024**2
+FAST_LISTDIR_MINSIZE: int = 256 * 1024
 
 
 def _now():
@@ -26,66 +140,507 @@ def _now():
 
 
 
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the module-level thread pool, creating it if not yet."""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(max_workers=PARALLEL_MAX_WORKERS)
+    return _EXECUTOR
+
+
+
+def _get_process_executor() -> ProcessPoolExecutor:
+    """Get the module-level process pool, creating it if not yet."""
+    global _PROCESS_EXECUTOR
+    if _PROCESS_EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _PROCESS_EXECUTOR is None:
+                _PROCESS_EXECUTOR = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _PROCESS_EXECUTOR
+
+
+
+def _result_or_run(future: Future, func, *args, **kwargs):
+    """Get the result of future, or run func(*args, **kwargs) in the current thread if it hasn't started yet.
+
+    Avoids deadlock when tasks running in _EXECUTOR submit & wait for more tasks to the same pool.
+    """
+    if future.cancel():
+        return func(*args, **kwargs)
+    return future.result()
+
+
+
 def _get_timestamp_str(timestamp: float) -> str:
     """Get the str version of time. Returns value in utc and is semi-human-readable.
     """
     return datetime.utcfromtimestamp(timestamp).strftime("%Y%m%d%H%M%S%f")
 
 
+@lru_cache(maxsize=1<<16)
+def _get_timestamp_sec_cached(sec: int) -> int:
+    """Whole-second part of datetime.utcfromtimestamp(sec).timestamp()."""
+    return int(datetime.utcfromtimestamp(sec).timestamp())
+
+
 def _get_timestamp_px6(timestamp: float) -> int:
     """Get the int version of time. Returns value in utc and is semi-human-readable.
+
+    Same as int(datetime.utcfromtimestamp(timestamp).timestamp()*1e6),
+        but only builds a datetime object once per second (cached).
     """
+    # round to microseconds the same way as datetime does
+    frac, sec = math.modf(timestamp)
+    sec = int(sec)
+    us  = round(frac * 1e6)
+    if us < 0:
+        sec -= 1
+        us  += 1000000
+    elif us >= 1000000:
+        sec += 1
+        us  -= 1000000
     # x1000000 to include the microseconds
-    return int(datetime.utcfromtimestamp(timestamp).timestamp()*1e6)
+    return int((_get_timestamp_sec_cached(sec) + us / 1e6) * 1e6)
+
+
+@lru_cache(maxsize=1<<16)
+def _get_timestamp_str_from_sec_cached(sec: int) -> str:
+    """Get the str version of time (to the second) from px6 // 1000000.
+
+    Same as datetime.fromtimestamp(sec).strftime("%Y%m%d%H%M%S"), without the datetime object.
+    """
+    t = time.localtime(sec)
+    return f'{t.tm_year:04d}{t.tm_mon:02d}{t.tm_mday:02d}{t.tm_hour:02d}{t.tm_min:02d}{t.tm_sec:02d}'
 
 
 def _get_timestamp_str_from_px6(timestamp_px6: int) -> str:
     """Get the str version of time. Returns value in utc and is semi-human-readable.
     """
-    return datetime.fromtimestamp(timestamp_px6/1e6).strftime("%Y%m%d%H%M%S%f")
+    sec, us = divmod(timestamp_px6, 1000000)
+    return f'{_get_timestamp_str_from_sec_cached(sec)}{us:06d}'
+
 
 
 
 
+# file extensions of backup files, by compression method
+_BKP_FILENAME_EXTS: dict[None|bool|str, str] = {None: '', False: '', '': '', 'gztar': '', 'gzip': '.gz', 'zstd': '.zst'}
 
-def _get_bkp_filename(dst_path: str, mtime_utc: str, compress: bool|str = False, verbose: int=4) -> str:
+def _get_bkp_filename(
+    dst_path: str, mtime_utc: str, compress: bool|str = False, verbose: int=4, tag: str = '',
+) -> str:
     """f-string combine dst path and mtime into backup file name.
+
+    dst_path should already be normalized (it is, in _backup_sub()).
+    tag: if not empty, appended to the mtime- to tell apart backups of different content with the same mtime.
     """
-    dst_path = os.path.normpath(dst_path)
-    dst_path_new = f'{dst_path}.bkp{mtime_utc}._bkp_'
-    if not compress or compress in {'gztar'}:
-        # do not add file extension
-        pass
-    elif compress in {'gzip'}:
-        dst_path_new += '.gz'
-    elif is_verbose(verbose, 'err'):
-        say('err', None, verbose, f"Unknown compression method '{compress}'. Will assume no extra file extension")
-    return dst_path_new
+    ext = _BKP_FILENAME_EXTS.get(compress)
+    if ext is None:
+        if is_verbose(verbose, LEVEL_ERR):
+            say('err', None, verbose, f"Unknown compression method '{compress}'. Will assume no extra file extension")
+        ext = ''
+    if tag:
+        return f'{dst_path}.bkp{mtime_utc}-{tag}._bkp_{ext}'
+    return f'{dst_path}.bkp{mtime_utc}._bkp_{ext}'
+
 
 
 
 
+def _fast_listdir(path: str):
+    """Yield (name, d_type, d_ino) of entries in dir path, by calling getdents64 with a large buffer. Linux only.
 
-def _get_dir_metadata(src_path: str) -> dict:
-    """Recursively get the metadata (newest mtime & total size) for a dir.
+    '.' and '..' are skipped.
+    d_type is one of the DT_* values (e.g. DT_DIR=4, DT_REG=8, DT_LNK=10; DT_UNKNOWN=0 if unsupported by the fs).
+    """
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        buf = ctypes.create_string_buffer(FAST_LISTDIR_BUFSIZE)
+        while True:
+            nread = _libc.syscall(_SYS_GETDENTS64, fd, buf, FAST_LISTDIR_BUFSIZE)
+            if nread < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err), path)
+            if nread == 0:
+                break
+            data = buf.raw[:nread]
+            pos  = 0
+            while pos < nread:
+                # struct linux_dirent64: u64 d_ino; s64 d_off; u16 d_reclen; u8 d_type; char d_name[];
+                d_ino, = struct.unpack_from('=Q', data, pos)
+                d_reclen, d_type = struct.unpack_from('=HB', data, pos + 16)
+                name = data[pos + 19 : data.index(b'\0', pos + 19)]
+                pos += d_reclen
+                if name not in {b'.', b'..'}:
+                    yield os.fsdecode(name), d_type, d_ino
+    finally:
+        os.close(fd)
+
+
+
+
+
+def _get_dir_metadata(src_path: str, src_stat: None|os.stat_result = None) -> dict:
+    """Get the metadata (newest mtime & total size) for a dir, walking through it with an explicit stack.
 
     Ignores things in symbolic links.
+    One (l)stat call per entry.
 
-    dst_path: str
+    src_path: str
         path to a file. Must not end with '/'. (Does not check that)
+
+    src_stat: os.stat_result
+        lstat() result of src_path, if already known.
     
     """
-    data = {
-        'size' : os.path.getsize( src_path),    # int
-        'mtime': os.path.getmtime(src_path),    # float
-    }
-    if os.path.isdir(src_path):
-        for filename in os.listdir(src_path):
-            new_data = _get_dir_metadata(f'{src_path}{sep}{filename}')
-            data['size'] += new_data['size']
-            if new_data['mtime'] > data['mtime']:
-                data['mtime'] = new_data['mtime']
-    return data
+    if src_stat is None:
+        src_stat = os.lstat(src_path)
+    size : int   = src_stat.st_size
+    mtime: float = src_stat.st_mtime
+    if stat.S_ISDIR(src_stat.st_mode):
+        stack = [src_path]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    size += entry_stat.st_size
+                    if entry_stat.st_mtime > mtime:
+                        mtime = entry_stat.st_mtime
+                    if stat.S_ISDIR(entry_stat.st_mode):
+                        stack.append(entry.path)
+    return {'size': size, 'mtime': mtime}
+
+
+
+
+
+def _new_hasher():
+    """Get a new hasher object of HASH_METHOD (with .update() & .hexdigest())."""
+    if blake3 is not None:
+        return blake3(max_threads=blake3.AUTO)
+    return xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b()
+
+
+
+def _copyfileobj(src_file, dst_file, bufsize: int = COPY_BUFSIZE, hasher = None):
+    """shutil.copyfileobj(src_file, dst_file, bufsize), also feeding the copied data to hasher if not None."""
+    if hasher is None:
+        shutil.copyfileobj(src_file, dst_file, bufsize)
+        return
+    while data := src_file.read(bufsize):
+        hasher.update(data)
+        dst_file.write(data)
+
+
+
+def _hash_file(src_path: str) -> str:
+    """Get the content hash of a file, as '{HASH_METHOD}:{hexdigest}'."""
+    hasher = _new_hasher()
+    if blake3 is not None:
+        hasher.update_mmap(src_path)
+    else:
+        with open(src_path, 'rb', buffering=0) as src_file:
+            # hash straight from the page cache via mmap, instead of copying chunks into python bytes
+            #    (empty files cannot be mmap-ed- nothing to hash anyway)
+            if os.fstat(src_file.fileno()).st_size:
+                with mmap.mmap(src_file.fileno(), 0, access=mmap.ACCESS_READ) as src_mmap:
+                    if hasattr(src_mmap, 'madvise'):
+                        src_mmap.madvise(mmap.MADV_SEQUENTIAL)
+                    hasher.update(src_mmap)
+    return f'{HASH_METHOD}:{hasher.hexdigest()}'
+
+
+
+def _get_file_hash(src_path: str, src_stat: os.stat_result, hash_cache: dict[str, dict[str, str]]) -> str:
+    """Get the content hash of a file, only reading the file if it is not already in hash_cache.
+
+    hash_cache: dict
+        {'old': {...}, 'new': {...}}, each a dict of {'{dev}:{ino}:{size}:{mtime_ns}:{ctime_ns}': hash}.
+        Looks up in both; the hash is (re-)recorded in hash_cache['new'],
+        so that hash_cache['new'] only has entries for files that still exist.
+        ctime is in the key because a rewrite can keep size & mtime (e.g. touch -r, rsync --times),
+            but always updates ctime- so a rewritten file is always re-hashed, whichever hash method is used.
+        If src_stat has no inode number (st_ino == 0, e.g. from os.DirEntry.stat() on windows),
+            the file is identified by src_path instead- '{src_path}:{size}:{mtime_ns}:{ctime_ns}'.
+    """
+    if src_stat.st_ino:
+        key = f'{src_stat.st_dev}:{src_stat.st_ino}:{src_stat.st_size}:{src_stat.st_mtime_ns}:{src_stat.st_ctime_ns}'
+    else:
+        key = f'{src_path}:{src_stat.st_size}:{src_stat.st_mtime_ns}:{src_stat.st_ctime_ns}'
+    ans = hash_cache['new'].get(key)
+    if ans is None:
+        ans = hash_cache['old'].get(key)
+        if ans is None or not ans.startswith(f'{HASH_METHOD}:'):
+            ans = _hash_file(src_path)
+        hash_cache['new'][key] = ans
+    return ans
+
+
+
+
+
+# ioctl request code for FICLONE (Linux)
+_FICLONE: int = 0x40049409
+
+def _ficlone(src_fd: int, dst_fd: int, size: int):
+    """Make dst_fd a copy-on-write clone of src_fd (reflink; Linux on Btrfs/XFS etc.). No data is copied."""
+    fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int):
+    """Copy size bytes in src_fd to dst_fd with os.copy_file_range (Linux; may reflink on CoW filesystems).
+
+    Stops early if src_fd ends before that.
+    Knowing the size saves the final call that would return 0 (i.e. one syscall per file).
+    """
+    while size > 0 and (ncopied := os.copy_file_range(src_fd, dst_fd, min(size, _KERNEL_COPY_CHUNKSIZE))):
+        size -= ncopied
+
+
+def _sendfile(src_fd: int, dst_fd: int, size: int):
+    """Copy size bytes in src_fd to dst_fd with os.sendfile. See _copy_file_range()."""
+    offset = 0
+    while offset < size and (nsent := os.sendfile(dst_fd, src_fd, offset, min(size - offset, _KERNEL_COPY_CHUNKSIZE))):
+        offset += nsent
+
+
+# in-kernel copy methods to try, in order
+_KERNEL_COPY_FUNCS = (_ficlone, _copy_file_range, _sendfile)
+# errnos meaning a kernel copy method does not work between two filesystems (rather than an I/O error)
+_KERNEL_COPY_UNSUPPORTED_ERRNOS: frozenset[int] = frozenset({
+    errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS, errno.EBADF})
+# {(kernel copy method, src dev, dst dev)} known not to work- so we do not retry them for every file
+_kernel_copy_unsupported: set[tuple] = set()
+
+
+
+# for opening files without following symbolic links (not available on windows)
+_O_NOFOLLOW: int = getattr(os, 'O_NOFOLLOW', 0)
+# for setting the metadata of copied files on their open fd, instead of by path (not available on windows)
+_METADATA_BY_FD: bool = os.utime in os.supports_fd and os.chmod in os.supports_fd
+# os.access() only checks the read-only attribute on windows (not ACLs or files locked by other programs)-
+#    test read permission by opening the file there instead
+_ACCESS_IGNORES_ACLS: bool = os.name == 'nt'
+
+def _open_nofollow(path: str, flags: int) -> int:
+    """opener for open(): fails with ELOOP (EMLINK on some BSDs) if path is a symbolic link."""
+    return os.open(path, flags | _O_NOFOLLOW)
+
+
+
+def _remove_existing(path: str):
+    """Remove file path if it exists, so that it is created anew instead of written through.
+
+    Writing through a backup file would also change every other backup hard-linked to it (hardlink_dedup).
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+
+def _fast_copy(src_path: str, dst_path: str, hasher = None) -> bool:
+    """Copy src file to dst file & its metadata, keeping the data in the kernel if possible.
+
+    Tries the methods in _KERNEL_COPY_FUNCS in order (skipping those known not to work between the two filesystems),
+        then falls back to shutil.copyfileobj with a COPY_BUFSIZE buffer.
+    Metadata: permission bits & access / modification times (unlike shutil.copy2, not extended attributes).
+    Symbolic links are copied as links.
+
+    hasher: if not None, the data is copied through userspace and fed to it (no kernel copy methods).
+
+    Returns False if src was copied as a symbolic link (nothing fed to hasher), True otherwise.
+    """
+    # detect symbolic links when opening the file (saves an lstat call), if possible
+    if not _O_NOFOLLOW and os.path.islink(src_path):
+        shutil.copy2(src_path, dst_path, follow_symlinks=False)
+        return False
+    try:
+        # unbuffered- the kernel copy methods do not need userspace buffers,
+        #    so do not allocate them for every file
+        src_file = open(src_path, 'rb', buffering=0, opener=_open_nofollow)
+    except OSError as e:
+        if e.errno not in {errno.ELOOP, errno.EMLINK}:
+            raise
+        shutil.copy2(src_path, dst_path, follow_symlinks=False)
+        return False
+    with src_file:
+        with open(dst_path, 'wb', buffering=0) as dst_file:
+            src_fd, dst_fd = src_file.fileno(), dst_file.fileno()
+            src_stat = os.fstat(src_fd)
+            devs = (src_stat.st_dev, os.fstat(dst_fd).st_dev)
+            # nothing to copy for empty files
+            for kernel_copy in _KERNEL_COPY_FUNCS if src_stat.st_size and hasher is None else ():
+                if (kernel_copy, *devs) in _kernel_copy_unsupported:
+                    continue
+                try:
+                    kernel_copy(src_fd, dst_fd, src_stat.st_size)
+                    break
+                except (AttributeError, OSError) as e:
+                    if not isinstance(e, OSError) or e.errno in _KERNEL_COPY_UNSUPPORTED_ERRNOS:
+                        _kernel_copy_unsupported.add((kernel_copy, *devs))
+                    # start over
+                    src_file.seek(0)
+                    dst_file.seek(0)
+                    dst_file.truncate()
+            else:
+                if src_stat.st_size:
+                    # buffered writer on top- raw writes may be partial
+                    with open(dst_fd, 'wb', buffering=COPY_BUFSIZE, closefd=False) as dst_buffered:
+                        _copyfileobj(src_file, dst_buffered, COPY_BUFSIZE, hasher)
+            # from the stat we already have, set on the open fd if possible- no path lookups
+            dst = dst_fd if _METADATA_BY_FD else dst_path
+            os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+            os.chmod(dst, stat.S_IMODE(src_stat.st_mode))
+    return True
+
+
+
+
+
+def _gzip_file(
+    src_path: str, dst_path: str, compresslevel: int = 1, src_size: None|int = None, bufsize: int = COPY_BUFSIZE,
+    hasher = None,
+):
+    """gzip src file to dst file, using the fastest gzip implementation available.
+
+    Files larger than GZIP_PARALLEL_MINSIZE are compressed in parallel blocks by pigz > isal > mgzip, if available.
+    Otherwise, preference: isal > libdeflate > stdlib gzip.
+    (isal only supports compresslevel 0-3.)
+    Files no larger than GZIP_INMEM_MAXSIZE are compressed in one go;
+        larger ones are memory-mapped and streamed.
+
+    src_size: int | None
+        Size of src file, if already known (only used to choose the method above)- saves a stat call.
+
+    bufsize: int
+        Buffer size (in bytes) for reading / writing when streaming.
+
+    hasher:
+        If not None, the uncompressed data is fed to it as it is read.
+        (pigz is skipped then- it reads the file by itself.)
+    """
+    if src_size is None:
+        src_size = os.path.getsize(src_path)
+    if src_size > GZIP_PARALLEL_MINSIZE and _PIGZ_PATH is not None and hasher is None:
+        with open(src_path, 'rb') as src_file:
+            with open(dst_path, 'wb') as dst_file:
+                subprocess.run([_PIGZ_PATH, f'-{compresslevel}', '-c'], stdin=src_file, stdout=dst_file, check=True)
+    elif src_size > GZIP_PARALLEL_MINSIZE and _igzip_threaded is not None and compresslevel <= _ISAL_MAX_LEVEL:
+        with open(src_path, 'rb', buffering=bufsize) as src_file:
+            with _igzip_threaded.open(
+                dst_path, 'wb', compresslevel=compresslevel, threads=os.cpu_count() or 1, block_size=bufsize,
+            ) as dst_file:
+                _copyfileobj(src_file, dst_file, bufsize, hasher)
+    elif src_size > GZIP_PARALLEL_MINSIZE and mgzip is not None:
+        with open(src_path, 'rb', buffering=bufsize) as src_file:
+            with mgzip.open(
+                dst_path, 'wb', compresslevel=compresslevel, thread=os.cpu_count() or 1, blocksize=2*1024**2,
+            ) as dst_file:
+                _copyfileobj(src_file, dst_file, bufsize, hasher)
+    elif src_size <= GZIP_INMEM_MAXSIZE:
+        with open(src_path, 'rb', buffering=0) as src_file:
+            data = src_file.read()
+        if hasher is not None:
+            hasher.update(data)
+        if _igzip is not None and compresslevel <= _ISAL_MAX_LEVEL:
+            data = _igzip.compress(data, compresslevel=compresslevel)
+        elif _libdeflate is not None:
+            data = _libdeflate.gzip_compress(data, compresslevel=compresslevel)
+        else:
+            # zlib directly (wbits=31: with gzip header & trailer)-
+            #    unlike gzip.compress, no separate crc32 pass & no concatenating header + data + trailer
+            data = zlib.compress(data, level=compresslevel, wbits=31)
+        with open(dst_path, 'wb') as dst_file:
+            dst_file.write(data)
+    elif hasher is not None:
+        # stream through userspace, so that what is hashed is exactly what gets compressed
+        #    (a memory-mapped src could change between hashing and compressing)
+        gzip_file_cls = _igzip.IGzipFile if _igzip is not None and compresslevel <= _ISAL_MAX_LEVEL else gzip.GzipFile
+        with open(src_path, 'rb', buffering=0) as src_file:
+            with open(dst_path, 'wb', buffering=bufsize) as dst_file:
+                with gzip_file_cls(filename='', fileobj=dst_file, mode='wb', compresslevel=compresslevel) as gz_file:
+                    _copyfileobj(src_file, gz_file, bufsize, hasher)
+    else:
+        # memory-map the src file & feed slices of it to gzip directly- no intermediate bytes objects
+        with open(src_path, 'rb', buffering=0) as src_file:
+            with mmap.mmap(src_file.fileno(), 0, access=mmap.ACCESS_READ) as src_mmap:
+                if hasattr(src_mmap, 'madvise'):
+                    src_mmap.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(src_mmap) as src_view:
+                    with open(dst_path, 'wb', buffering=bufsize) as dst_file:
+                        if _igzip is not None and compresslevel <= _ISAL_MAX_LEVEL:
+                            with _igzip.IGzipFile(fileobj=dst_file, mode='wb', compresslevel=compresslevel) as gz_file:
+                                for i in range(0, len(src_view), bufsize):
+                                    gz_file.write(src_view[i:i+bufsize])
+                        else:
+                            # zlib directly (wbits=31: with gzip header & trailer)-
+                            #    zlib computes the crc32 while compressing, unlike gzip.GzipFile (separate pass)
+                            compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+                            for i in range(0, len(src_view), bufsize):
+                                dst_file.write(compressor.compress(src_view[i:i+bufsize]))
+                            dst_file.write(compressor.flush())
+
+
+
+
+
+def _make_gztar(
+    base_name: str, root_dir: str, base_dir: str, compresslevel: int = 1, bufsize: int = COPY_BUFSIZE,
+    verbose: int = 4,
+) -> str:
+    """Archive root_dir/base_dir into base_name.tar.gz. Same call signature as shutil.make_archive(..., 'gztar').
+
+    If both the tar and pigz commands are available, streams tar output into pigz (parallel gzip);
+        otherwise streams tarfile output into gzip (isal if available) in one pass.
+    No file name / timestamp in the gzip header, so archives of the same content are identical.
+    tar exiting with 1 (e.g. 'file changed as we read it', routine on live trees) is only a warning;
+        on any real failure, the partial archive is removed before re-raising.
+
+    Returns the archive file name.
+    """
+    archive_name = f'{base_name}.tar.gz'
+    try:
+        _remove_existing(archive_name)
+        if _TAR_PATH is None or _PIGZ_PATH is None:
+            gzip_file_cls = (
+                _igzip.IGzipFile if _igzip is not None and compresslevel <= _ISAL_MAX_LEVEL else gzip.GzipFile)
+            with open(archive_name, 'wb', buffering=bufsize) as raw_file:
+                # no file name & mtime=0 in the header: reproducible archives- the same content gives the same file
+                with gzip_file_cls(
+                    filename='', fileobj=raw_file, mode='wb', compresslevel=compresslevel, mtime=0,
+                ) as gz_file:
+                    with tarfile.open(fileobj=gz_file, mode='w|', bufsize=bufsize) as tar_file:
+                        tar_file.add(os.path.join(root_dir, base_dir), arcname=base_dir)
+            return archive_name
+
+        with open(archive_name, 'wb') as dst_file:
+            tar_proc  = subprocess.Popen([_TAR_PATH, '-C', root_dir, '-cf', '-', base_dir], stdout=subprocess.PIPE)
+            pigz_proc = subprocess.Popen(
+                [_PIGZ_PATH, f'-{compresslevel}', '-n', '-c'], stdin=tar_proc.stdout, stdout=dst_file)
+            # so that tar gets SIGPIPE if pigz exits early
+            tar_proc.stdout.close()
+            pigz_returncode = pigz_proc.wait()
+            tar_returncode  = tar_proc.wait()
+        if tar_returncode > 1:
+            raise subprocess.CalledProcessError(tar_returncode, tar_proc.args)
+        if pigz_returncode:
+            raise subprocess.CalledProcessError(pigz_returncode, pigz_proc.args)
+    except BaseException:
+        try:
+            os.remove(archive_name)
+        except FileNotFoundError:
+            pass
+        raise
+    if tar_returncode and is_verbose(verbose, LEVEL_WARN):
+        # GNU tar: 1 means some files differ / changed while being archived- the archive is still complete
+        say('warn', None, verbose,
+            f"tar exited with {tar_returncode} while archiving '{os.path.join(root_dir, base_dir)}'",
+            "(some files changed as we read them?) Archive kept.")
+    return archive_name
 
 
 
@@ -97,52 +652,89 @@ def _save_bkp_file(
     action  : str  = 'copy',
     dry_run : bool = False,
     compress: bool|str = False,
+    src_size: None|int = None,
+    compresslevel: None|int = None,
+    bufsize : int  = COPY_BUFSIZE,
     verbose : int  = 4,
-):
+    return_hash: bool = False,
+) -> None|str:
     """Save source file to the destination file.    
+
+    An existing dst file is removed first instead of written through-
+        it may be hard-linked to other backups (see hardlink_dedup in backup()).
+
+    src_size: size of the source file, if already known (e.g. from the filetree)- saves a stat call.
+    compresslevel: compression level. If None, use the default of the compression method (gzip: 1; zstd: 3).
+    bufsize: buffer size (in bytes) for reading / writing when compressing.
+    return_hash: if True, hash the data while it is being saved,
+        and return it as '{HASH_METHOD}:{hexdigest}' (see _hash_file()).
+        Returns None if nothing was hashed (dry_run, src was copied as a symbolic link, or errors).
     """
+    hasher = _new_hasher() if return_hash and not dry_run else None
 
     if not compress:
-        if action in {'copy', 'Copy', 'cp', 'move', 'Move', 'mv'}:
-            if is_verbose(verbose, 'note'):
+        if action in _COPY_ACTIONS:
+            if is_verbose(verbose, LEVEL_NOTE):
                 say('note', None, verbose, f"Copying '{src_path}' to '{dst_path}'")
             if not dry_run:
-                shutil.copy2(src_path, dst_path, follow_symlinks=False)
+                _remove_existing(dst_path)
+                if not _fast_copy(src_path, dst_path, hasher):
+                    hasher = None
             #if action in {'move', 'Move', 'mv'}:
-            #    if is_verbose(verbose, 'note'):
+            #    if is_verbose(verbose, LEVEL_NOTE):
             #        say('note', None, verbose, f"Removing '{src_path}'")
             #    if not dry_run:
             #        os.remove(src_path)
-            return
+            return None if hasher is None else f'{HASH_METHOD}:{hasher.hexdigest()}'
     
     elif compress in {'gzip'}:
         # sanity check
-        if is_verbose(verbose, 'warn') and compress not in {'gzip'}:
+        if compress not in {'gzip'} and is_verbose(verbose, LEVEL_WARN):
             say('warn', None, verbose,
                 f"Unrecognized compression method {compress=},",
                 "Will compress with gzip instead.",
             )
 
         # do stuff
-        if action in {'copy', 'Copy', 'cp', 'move', 'Move', 'mv'}:
-            if is_verbose(verbose, 'note'):
+        if action in _COPY_ACTIONS:
+            if is_verbose(verbose, LEVEL_NOTE):
                 say('note', None, verbose, f"gzip-ing '{src_path}' to '{dst_path}'")
             if not dry_run:
-                with open(src_path, 'rb') as src_file:
-                    with gzip.open(dst_path, 'wb') as dst_file:
-                        shutil.copyfileobj(src_file, dst_file)
-                        #dst_file.writelines(src_file)
+                _remove_existing(dst_path)
+                _gzip_file(
+                    src_path, dst_path, compresslevel=1 if compresslevel is None else compresslevel,
+                    src_size=src_size, bufsize=bufsize, hasher=hasher)
             #if action in {'move', 'Move', 'mv'}:
-            #    if is_verbose(verbose, 'note'):
+            #    if is_verbose(verbose, LEVEL_NOTE):
             #        say('note', None, verbose, f"Removing '{src_path}'")
             #    if not dry_run:
             #        os.remove(src_path)
-            return
-    elif is_verbose(verbose, 'err'):
+            return None if hasher is None else f'{HASH_METHOD}:{hasher.hexdigest()}'
+
+    elif compress in {'zstd'}:
+        if action in _COPY_ACTIONS:
+            if is_verbose(verbose, LEVEL_NOTE):
+                say('note', None, verbose, f"zstd-ing '{src_path}' to '{dst_path}'")
+            if not dry_run:
+                # threads=-1: use all logical cpus
+                # write_checksum: store a checksum of the content in the frame (computed in the same pass),
+                #    so that corrupted backups are detected on decompression- like the CRC32 in gzip files
+                compressor = zstandard.ZstdCompressor(
+                    level=3 if compresslevel is None else compresslevel, threads=-1, write_checksum=True)
+                _remove_existing(dst_path)
+                with open(src_path, 'rb', buffering=bufsize) as src_file:
+                    with open(dst_path, 'wb', buffering=bufsize) as dst_file:
+                        if hasher is None:
+                            compressor.copy_stream(src_file, dst_file, read_size=bufsize, write_size=bufsize)
+                        else:
+                            with compressor.stream_writer(dst_file, write_size=bufsize, closefd=False) as zst_file:
+                                _copyfileobj(src_file, zst_file, bufsize, hasher)
+            return None if hasher is None else f'{HASH_METHOD}:{hasher.hexdigest()}'
+    elif is_verbose(verbose, LEVEL_ERR):
         say('err', None, verbose, f"Unrecognized compression method {compress=}")
         return
             
-    if is_verbose(verbose, 'err'):
+    if is_verbose(verbose, LEVEL_ERR):
         say('err', None, verbose, f"Unrecognized {action=}")
     return
 
@@ -156,14 +748,49 @@ def _save_bkp_file(
 
 
 
+def _link_bkp_file(
+    old_dst_path: str,
+    dst_path    : str,
+    dry_run     : bool = False,
+    verbose     : int  = 4,
+) -> bool:
+    """Hard-link an existing backup file with the same content to the destination file, instead of copying.
+
+    Returns True if successful (or if dry_run),
+        False if it can't be done (e.g. old_dst_path no longer exists, or the filesystem doesn't support hard links).
+    """
+    if is_verbose(verbose, LEVEL_NOTE):
+        say('note', None, verbose, f"Hard-linking '{old_dst_path}' to '{dst_path}' (same content)")
+    if dry_run:
+        return True
+    try:
+        _remove_existing(dst_path)
+        os.link(old_dst_path, dst_path)
+    except OSError:
+        if is_verbose(verbose, LEVEL_INFO):
+            say('info', None, verbose, f"Cannot hard-link '{old_dst_path}'. Will copy instead.")
+        return False
+    return True
+
+
+
 
 
 def get_filetree(
     src_path: str,
     src_filename: None|str = None,
-    gztar_list  : set[str]|list[str] = {'.git'},
-    ignore_list : set[str]|list[str] = {'__pycache__', '.ipynb_checkpoints'},
+    gztar_list  : frozenset[str]|set[str]|list[str] = DEFAULT_GZTAR_LIST,
+    ignore_list : frozenset[str]|set[str]|list[str] = DEFAULT_IGNORE_LIST,
+    compress    : str  = DEFAULT_COMPRESS,
+    src_entry   : None|os.DirEntry = None,
+    hash_cache  : None|dict[str, dict[str, str]] = None,
+    parallel    : bool = True,
+    old_filetree: None|dict = None,
+    trust_dir_mtime : bool = False,
+    sort_by_inode   : bool = DEFAULT_SORT_BY_INODE,
     verbose     : int  = 4,
+    _is_normalized: bool = False,
+    _depth      : int  = 0,
 ) -> None|tuple[str, dict]:
     """Recursively scan src_path and Get a dict of its tree of file structures.
 
@@ -190,9 +817,51 @@ def get_filetree(
         Ignore files/folders within this list at all.
         Only check this if src_path points to a folder.
 
+        (Both lists are converted to frozensets once, at the top-level call.)
+
+    compress: str
+        Compression method for files. 'zstd' or 'gzip'.
+
+    src_entry: os.DirEntry | None
+        os.scandir() entry of src_path, if available- saves a stat call.
+
+    hash_cache: dict | None
+        If not None, will also record the content hash of files in 'hash' (see _get_file_hash()).
+
+    parallel: bool
+        Scan sub-directories in parallel with a thread pool
+        (only in the top PARALLEL_MAX_DEPTH levels, for dirs with more than PARALLEL_MIN_ENTRIES entries).
+
+    old_filetree: dict | None
+        The filetree of src_path from last scan (same format as the returned filetree).
+        If hash_cache is None, entries of files / links with unchanged type, size and mtime are reused from it
+            (instead of building new ones).
+
+    trust_dir_mtime: bool
+        If True, for dirs whose own mtime ('dir_mtime_px6') is unchanged since old_filetree,
+            the list of entries will be taken from old_filetree instead of read again,
+            and (if hash_cache is None) the entries of files / links in it will be reused without a stat call.
+            Sub-directories are still checked (their own mtime might have changed).
+        WARNING: a dir's mtime only changes when entries are added / removed / renamed in it-
+            so files modified in place (without changing the dir mtime) will be MISSED.
+        Likewise, entries skipped by the old scan (e.g. unreadable, or dangling links) are not in old_filetree
+            and will not be re-checked until the dir's own mtime changes.
+
+    sort_by_inode: bool
+        Scan (and list in 'sub_files') the entries of each dir in the order of their inode numbers,
+            which roughly follows their location on disk- fewer seeks on spinning disks.
+        Free on posix- the inode numbers come with the dir listing. No effect on entries taken from old_filetree.
+        Off by default on windows (see DEFAULT_SORT_BY_INODE).
+
     verbose: int
         Wehther errors, warnings, notes, and debug info should be printed on screen. 
 
+    _is_normalized: bool
+        Internal use. If True, src_path is already normalized (as in recursive calls), so skip that.
+
+    _depth: int
+        Internal use. Recursion depth.
+
     Returns: src_filename, filetree
     -------
     filetree: dict
@@ -202,24 +871,120 @@ def get_filetree(
             'size': int
             'compr_mth': str    # compression method ('' for not compressing)
             'mtime_utc': int
+            'dir_mtime_px6': int
+                Only exist if 'type'=='dir' and it's not a gztar-ed dir.
+                mtime of the dir itself (while 'mtime_px6' is the latest among itself and all its content).
+            'hash': str
+                Only exist if hash_cache is not None and it's not a gztar-ed dir.
+                For dirs, it's the hash of the names, types and hashes (or mtime if no hash) of its sub_files.
             'sub_files': dict
                 Only exist if 'type'=='dir'
                 same format as this dict
     """
-    # normalize path
-    src_path = os.path.normpath(src_path)
+    # normalize path (& the lists to frozensets for fast lookups- recursive calls get them as is)
+    if not _is_normalized:
+        src_path = os.path.normpath(src_path)
+        gztar_list  = frozenset(gztar_list)
+        ignore_list = frozenset(ignore_list)
     if src_filename is None:
         src_filename = os.path.basename(src_path)
 
+    scan_kwargs = {
+        'gztar_list': gztar_list, 'ignore_list': ignore_list, 'compress': compress, 'hash_cache': hash_cache,
+        'trust_dir_mtime': trust_dir_mtime, 'sort_by_inode': sort_by_inode}
+    scanned = _scan_filetree_entry(
+        src_path, src_filename, src_entry=src_entry, old_filetree=old_filetree, verbose=verbose, **scan_kwargs)
+    if scanned is None:
+        return None
+    ans, children = scanned
+    if children is None:
+        return src_filename, ans
+
+    if parallel and _depth < PARALLEL_MAX_DEPTH and len(children) > PARALLEL_MIN_ENTRIES:
+        # top levels: scan sub-directories in parallel, each with a (recursive) get_filetree call
+        kwargs = {**scan_kwargs, 'parallel': parallel, '_is_normalized': True, '_depth': _depth + 1}
+        executor = _get_executor()
+        futures = [
+            executor.submit(get_filetree, path, filename, src_entry=entry, old_filetree=old_sub_file, **kwargs)
+            for path, filename, entry, old_sub_file in children
+        ]
+        for future, (path, filename, entry, old_sub_file) in zip(futures, children):
+            sub_file = _result_or_run(
+                future, get_filetree, path, filename, src_entry=entry, old_filetree=old_sub_file, **kwargs)
+            # remove invalid files
+            if sub_file is not None:
+                ans['sub_files'][sub_file[0]] = sub_file[1]
+        _finish_filetree_dir(ans, hash_cache)
+        return src_filename, ans
+
+    # deeper levels: depth-first walk with an explicit stack (no recursion)
+    #    each stack frame: (filetree of a dir, iterator of its children yet to scan)
+    stack = [(ans, iter(children))]
+    while stack:
+        dir_ans, children_iter = stack[-1]
+        child = next(children_iter, None)
+        if child is None:
+            # all children scanned
+            stack.pop()
+            _finish_filetree_dir(dir_ans, hash_cache)
+            continue
+        path, filename, entry, old_sub_file = child
+        scanned = _scan_filetree_entry(
+            path, filename, src_entry=entry, old_filetree=old_sub_file, verbose=verbose, **scan_kwargs)
+        # remove invalid files
+        if scanned is None:
+            continue
+        sub_ans, sub_children = scanned
+        dir_ans['sub_files'][filename] = sub_ans
+        if sub_children is not None:
+            stack.append((sub_ans, iter(sub_children)))
+    return src_filename, ans
+
+
+
+
+
+def _scan_filetree_entry(
+    src_path    : str,
+    src_filename: str,
+    gztar_list  : frozenset[str],
+    ignore_list : frozenset[str],
+    compress    : str,
+    src_entry   : None|os.DirEntry = None,
+    hash_cache  : None|dict[str, dict[str, str]] = None,
+    old_filetree: None|dict = None,
+    trust_dir_mtime : bool = False,
+    sort_by_inode   : bool = DEFAULT_SORT_BY_INODE,
+    verbose     : int  = 4,
+) -> None|tuple[dict, None|list[tuple[str, str, None|os.DirEntry, None|dict]]]:
+    """Scan src_path itself (but not its content) for get_filetree().
+
+    See get_filetree() for parameters.
+
+    Returns: None if src_path should not be in the filetree, or
+        filetree, children
+    -------
+    filetree: dict
+        For dirs to be scanned, it only includes the dir itself
+            (plus the entries reused from old_filetree in 'sub_files')-
+            call _finish_filetree_dir() on it after scanning its children and putting them into 'sub_files'.
+    children: list | None
+        None if src_path is not a dir to be scanned;
+        otherwise, list of (path, name, DirEntry|None, old filetree|None) of its children to be scanned.
+    """
+
     if src_filename in ignore_list:
         return None
         
     # safety check: if file exists
-    #     lexist() because we want to backup symbolic links as well
-    if not os.path.lexists(src_path):
-        if is_verbose(verbose, 'err'):
+    #     lstat() because we want to backup symbolic links as well
+    try:
+        src_stat = os.lstat(src_path) if src_entry is None else src_entry.stat(follow_symlinks=False)
+    except FileNotFoundError:
+        if is_verbose(verbose, LEVEL_ERR):
             say('err', None, verbose, f"File '{src_path}' does not exist.")
         return None
+    src_is_link = stat.S_ISLNK(src_stat.st_mode)
 
     
     ans = {
@@ -232,76 +997,145 @@ def get_filetree(
         'mtime_utc': '',
         #'sub_files': None,
     }
+    children = None
 
 
-    if os.path.isfile(src_path) or os.path.islink(src_path):
-        if is_verbose(verbose, 'warn') and os.path.islink(src_path):
+    if stat.S_ISREG(src_stat.st_mode) or src_is_link:
+        if src_is_link and is_verbose(verbose, LEVEL_WARN):
             say('warn', None, verbose,
                 f"Will not backup content in the folder pointed by symbolic link '{src_path}'")
                 
         try:
             # testing if we have read permission
-            with open(src_path, 'rb'):
-                pass
+            if src_is_link or _ACCESS_IGNORES_ACLS:
+                # open it (unbuffered- we don't read anything),
+                #    and get the stat of the file pointed to from the opened fd- no second path lookup
+                with open(src_path, 'rb', buffering=0) as src_file:
+                    ans_stat = os.fstat(src_file.fileno())
+            elif os.access(src_path, os.R_OK):
+                # regular files: one access() call, instead of open() + fstat() + close()
+                ans_stat = src_stat
+            else:
+                raise PermissionError
         except PermissionError:
-        #if not os.access(src_path, os.R_OK):
-            if is_verbose(verbose, 'err'):
+            if is_verbose(verbose, LEVEL_ERR):
                 say('err', None, verbose, f"Permission Error on file '{src_path}': No read access. Skipping this.")
             return None
         except IsADirectoryError:
             # Band-Aid fix- *** pending improvement ***
-            if is_verbose(verbose, 'err'):
+            if is_verbose(verbose, LEVEL_ERR):
                 say('err', None, verbose,
                     f"'{src_path}' seems to be a file, but is a directory." +
                     "symbolic link? Skipping this (and anything it points to.)"
                 )
             return None
+        except FileNotFoundError:
+            if is_verbose(verbose, LEVEL_ERR):
+                say('err', None, verbose, f"'{src_path}' seems to be a broken symbolic link. Skipping this.")
+            return None
         else:
-            ans['type'] = 'file' if os.path.isfile(src_path) else 'link'
+            # for links, use the stat of the file pointed to
+            ans['type'] = 'file' if stat.S_ISREG(ans_stat.st_mode) else 'link'
             #ans['name'] = src_filename
-            ans_stat = os.stat(src_path)
             ans['size'] = ans_stat.st_size #os.path.getsize(src_path)
-            ans['compr_mth'] = 'gzip'
+            ans['compr_mth'] = compress
             ans['mtime_px6'] = _get_timestamp_px6(ans_stat.st_mtime)
             #ans['mtime_utc'] = _get_timestamp_str(ans_stat.st_mtime)
-
-    elif os.path.isdir(src_path):
+            if hash_cache is not None:
+                ans['hash'] = _get_file_hash(src_path, ans_stat, hash_cache)
+            elif (isinstance(old_filetree, dict)
+                  and old_filetree.get('mtime_px6') == ans['mtime_px6']
+                  and old_filetree.get('size') == ans['size']
+                  and old_filetree.get('type') == ans['type']
+                  and old_filetree.get('compr_mth') == compress
+                  and old_filetree.get('no_f') == 1
+                  and 'mtime_utc' in old_filetree):
+                # unchanged since last scan- reuse the old entry
+                return old_filetree, None
+
+    elif stat.S_ISDIR(src_stat.st_mode):
 
         ans['type'] = 'dir'
         #ans['name'] = src_filename
         ans['sub_files'] = {}
         if src_filename not in gztar_list:
-            sub_files_list   = [
-                get_filetree(
-                    f'{src_path}{sep}{filename}', filename,
-                    gztar_list=gztar_list, ignore_list=ignore_list)
-                for filename in os.listdir(src_path)
-                if filename not in ignore_list
+            ans['dir_mtime_px6'] = _get_timestamp_px6(src_stat.st_mtime)
+            old_sub_files = {}
+            if isinstance(old_filetree, dict) and isinstance(old_filetree.get('sub_files'), dict):
+                old_sub_files = old_filetree['sub_files']
+            # entries: list of (path, name, DirEntry|None)
+            src_prefix = f'{src_path}{sep}'
+            old_entries_trusted = (
+                trust_dir_mtime and old_filetree is not None and old_filetree.get('dir_mtime_px6') == ans['dir_mtime_px6'])
+            if old_entries_trusted:
+                entries = [
+                    (f'{src_prefix}{filename}', filename, None)
+                    for filename in old_sub_files
+                    if filename not in ignore_list
+                ]
+            elif _libc is not None and src_stat.st_size >= FAST_LISTDIR_MINSIZE:
+                listing = list(_fast_listdir(src_path))
+                if sort_by_inode:
+                    listing.sort(key=itemgetter(2))
+                entries = [
+                    (f'{src_prefix}{filename}', filename, None)
+                    for filename, _, _ in listing
+                    if filename not in ignore_list
+                ]
+            else:
+                with os.scandir(src_path) as it:
+                    listing = list(it)
+                if sort_by_inode:
+                    # DirEntry.inode() is from the dir listing on posix- no syscall
+                    listing.sort(key=os.DirEntry.inode)
+                entries = [(entry.path, entry.name, entry) for entry in listing if entry.name not in ignore_list]
+            if old_entries_trusted and hash_cache is None:
+                # reuse the old entries of files / links as is
+                for path, filename, entry in entries:
+                    old_sub_file = old_sub_files[filename]
+                    if old_sub_file.get('type') in {'file', 'link'} and old_sub_file.get('compr_mth') == compress:
+                        ans['sub_files'][filename] = old_sub_file
+            children = [
+                (path, filename, entry, old_sub_files.get(filename))
+                for path, filename, entry in entries
+                if filename not in ans['sub_files']
             ]
-            # remove invalid files
-            #ans['sub_files'] = [sub_file for sub_file in sub_files_list if sub_file is not None]
-            ans['sub_files'] = {sub_file[0]: sub_file[1] for sub_file in sub_files_list if sub_file is not None}
-            ans_stat = os.stat(src_path)
-            ans['no_f']      = int(ans['no_f'] + np.sum([
-                ans['sub_files'][sub_filename]['no_f'] for sub_filename in ans['sub_files'].keys()
-            ]))
-            ans['size']      = ans_stat.st_size + int(np.sum([
-                ans['sub_files'][sub_filename]['size'] for sub_filename in ans['sub_files'].keys()
-            ]))
-            ans['compr_mth'] = ''
-            ans['mtime_px6'] = int(max(_get_timestamp_px6(ans_stat.st_mtime), np.max([
-                ans['sub_files'][sub_filename]['mtime_px6'] for sub_filename in ans['sub_files'].keys()
-            ], initial=0)))
+            # own size & mtime- content will be added in _finish_filetree_dir()
+            ans['size']      = src_stat.st_size
+            ans['mtime_px6'] = ans['dir_mtime_px6']
+            return ans, children
         else:
             ans['compr_mth'] = 'gztar'
-            data = _get_dir_metadata(src_path)
+            data = _get_dir_metadata(src_path, src_stat)
             ans['size']  = data['size']
             ans['mtime_px6'] = _get_timestamp_px6(data['mtime'])
             
     ans['mtime_utc'] = _get_timestamp_str_from_px6(ans['mtime_px6'])
-    
-    filetree = ans
-    return src_filename, filetree
+    return ans, children
+
+
+
+
+
+def _finish_filetree_dir(ans: dict, hash_cache: None|dict[str, dict[str, str]] = None):
+    """Add up the content in ans['sub_files'] to the filetree of a dir (in-place). See _scan_filetree_entry()."""
+    # accumulate in one pass- faster than separate sum() / max() over the (typically) few entries in a dir
+    no_f, size, mtime_px6 = ans['no_f'], ans['size'], ans['mtime_px6']
+    for sub_file in ans['sub_files'].values():
+        no_f += sub_file['no_f']
+        size += sub_file['size']
+        if sub_file['mtime_px6'] > mtime_px6:
+            mtime_px6 = sub_file['mtime_px6']
+    ans['no_f']      = no_f
+    ans['size']      = size
+    ans['mtime_px6'] = mtime_px6
+    if hash_cache is not None:
+        hasher = hashlib.blake2b()
+        for sub_filename, sub_file in sorted(ans['sub_files'].items()):
+            sub_hash = sub_file.get('hash', sub_file['mtime_px6'])
+            hasher.update(f"{sub_filename}\0{sub_file['type']}\0{sub_hash}\0".encode())
+        ans['hash'] = f'{HASH_METHOD}:{hasher.hexdigest()}'
+    ans['mtime_utc'] = _get_timestamp_str_from_px6(ans['mtime_px6'])
 
 
 
@@ -315,11 +1149,26 @@ def _backup_sub(
     filecmp_shallow : bool,
     dry_run     : bool,
     verbose     : int,
+    dedup_index : None|dict[str, str] = None,
+    compresslevel   : None|int = None,
+    bufsize     : int  = COPY_BUFSIZE,
+    use_processes   : bool = False,
 ) -> tuple[int, int, int, int]:
     """Recursive sub process for the backup function.
     
     Will compress and save everything to new destination.
 
+    dedup_index: dict | None
+        If not None, dict of {'{compr_mth}:{hash}': existing backup file path}.
+        Files (with 'hash' in new_filetree) matching an existing backup will be hard-linked to it instead of copied.
+        New backup files are added to it.
+
+    compresslevel, bufsize:
+        see _save_bkp_file().
+
+    use_processes: bool
+        If True, save (compressed) files in a process pool instead of the thread pool.
+
     Returns: no_skip, no_copy, no_tgz, no_dir
     """
 
@@ -327,15 +1176,61 @@ def _backup_sub(
     no_copy = 0
     no_tgz  = 0  # no of tgz file
     no_dir  = 0
+    # file copies & dir archives are submitted to the thread pool as they come, and collected at the end,
+    #    so they overlap with each other and with the sub-directories being processed
+    #    each task: (future, func, args, kwargs, index_dedup)
+    copy_tasks : list[tuple[Future, object, tuple, dict, bool]] = []
+    copy_executor: Executor = _get_process_executor() if use_processes else _get_executor()
+    # verbosity does not change within the loop
+    verbose_fatal= is_verbose(verbose, LEVEL_FATAL)
+    verbose_err  = is_verbose(verbose, LEVEL_ERR)
+    verbose_info = is_verbose(verbose, LEVEL_INFO)
+    verbose_note = is_verbose(verbose, LEVEL_NOTE)
+    verbose_warn = is_verbose(verbose, LEVEL_WARN)
+    # names of entries unchanged since last backup, by their (type, size, mtime_px6, no_f) signatures
+    #    compared all at once with set operations, instead of field by field
+    new_sigs = {
+        fname: (filedata.get('type'), filedata.get('size'), filedata.get('mtime_px6'), filedata.get('no_f'))
+        for fname, filedata in new_filetree.items()
+    }
+    old_sigs = {
+        # no_f was not recorded by older versions
+        fname: (filedata.get('type'), filedata.get('size'), filedata.get('mtime_px6'),
+                filedata.get('no_f', new_sigs[fname][3] if fname in new_sigs else None))
+        for fname, filedata in old_filetree.items() if isinstance(filedata, dict)
+    }
+    unchanged = {fname for fname, _ in new_sigs.items() & old_sigs.items()}
+    # paths are already normalized- just join them
+    src_prefix = f'{src_path}{sep}'
+    dst_prefix = f'{dst_path}{sep}'
+    if filecmp_shallow:
+        # no content comparison- the unchanged (and intact) entries can be skipped in bulk,
+        #    leaving only the changed / new ones to the loop below
+        unchanged = {
+            fname for fname in unchanged
+            if _FILETREE_REQUIRED_KEYS.issubset(new_filetree[fname])
+            and _FILETREE_REQUIRED_KEYS_OLD.issubset(old_filetree[fname])
+        }
+        for fname in unchanged:
+            if verbose_info:
+                say('info', None, verbose, f"Skipping {new_filetree[fname]['type']} '{src_prefix}{fname}'")
+            no_skip += new_filetree[fname]['no_f']
     
-    for fname in new_filetree.keys():
-        new_filedata      = new_filetree[fname]
-        src_filepath      = f'{src_path}{sep}{fname}'
-        dst_filepath_base = f'{dst_path}{sep}{fname}'
-        old_filedata = old_filetree[fname] if fname in old_filetree.keys() and isinstance(old_filetree[fname], dict) else {}
-        # sanity check
-        if not {'type', 'no_f', 'size', 'compr_mth', 'mtime_px6', 'mtime_utc'}.issubset(new_filedata.keys()):
-            if is_verbose(verbose, 'fatal'):
+    for fname, new_filedata in new_filetree.items():
+        if filecmp_shallow and fname in unchanged:
+            continue
+        src_filepath      = src_prefix + fname
+        dst_filepath_base = dst_prefix + fname
+        old_filedata = old_filetree.get(fname)
+        if not isinstance(old_filedata, dict):
+            old_filedata = {}
+        # sanity check (and get the fields used below in one go)
+        try:
+            new_type, new_no_f, new_size, new_compr_mth, _, new_mtime_utc = (
+                new_filedata['type'], new_filedata['no_f'], new_filedata['size'],
+                new_filedata['compr_mth'], new_filedata['mtime_px6'], new_filedata['mtime_utc'])
+        except KeyError:
+            if verbose_fatal:
                 raise ValueError(
                     f"filetree corruption:"+
                     f"'type', 'no_f', 'size', 'compr_mth', 'mtime_px6', 'mtime_utc'"+
@@ -345,51 +1240,82 @@ def _backup_sub(
         else:
             do_backup = True
             if old_filedata:
-                
-                if not filecmp_shallow and is_verbose(verbose, 'fatal'):
-                    raise NotImplementedError("filecmp_shallow=True has not yet been implemented.")
                     
-                if not {'type', 'size', 'mtime_px6'}.issubset(old_filedata.keys()):
-                    if is_verbose(verbose, 'err'):
+                if not _FILETREE_REQUIRED_KEYS_OLD.issubset(old_filedata):
+                    if verbose_err:
                         say('err', None, verbose,
                             f"filetree corruption: 'type', 'size', 'mtime_px6' should be in {old_filedata.keys()=}",
                             "but it's not.")
-                elif (new_filedata['mtime_px6'] == old_filedata['mtime_px6']
-                      and new_filedata['size' ] == old_filedata['size']
-                      and new_filedata['type' ] == old_filedata['type']):
+                elif (not filecmp_shallow and 'hash' in new_filedata and 'hash' in old_filedata
+                      and new_filedata['hash'].partition(':')[0] == old_filedata['hash'].partition(':')[0]):
+                    # compare content instead of mtime
+                    #    (only if hashed with the same method- e.g. not right after blake3 got installed)
+                    if (new_filedata['hash'] == old_filedata['hash']
+                        and new_size == old_filedata['size']
+                        and new_type == old_filedata['type']):
+                        do_backup = False
+                elif fname in unchanged:
+                    # for dirs, (mtime_px6, size, no_f) is the fingerprint of the whole sub tree,
+                    #    so we can skip it without going deeper
                     do_backup = False
                     
         # do backup
         if not do_backup:
-            if is_verbose(verbose, 'info'):
+            if verbose_info:
                 say('info', None, verbose, f"Skipping {new_filedata['type']} '{src_filepath}'")
             no_skip += new_filedata['no_f']
         else:
-            if new_filedata['type'] in {'file', 'link'}:
+            if new_type in {'file', 'link'}:
                 dst_filepath = _get_bkp_filename(
-                    f'{dst_filepath_base}', new_filedata['mtime_utc'], compress=new_filedata['compr_mth'], verbose=verbose)
-                if is_verbose(verbose, 'warn') and os.path.exists(f'{dst_filepath}'):
+                    dst_filepath_base, new_mtime_utc, compress=new_compr_mth, verbose=verbose)
+                if 'hash' in new_filedata and os.path.lexists(dst_filepath):
+                    # content changed but mtime did not (caught by the hash)-
+                    #    keep the previous backup, and name this one by its content too
+                    dst_filepath = _get_bkp_filename(
+                        dst_filepath_base, new_mtime_utc, compress=new_compr_mth, verbose=verbose,
+                        tag=new_filedata['hash'].partition(':')[2][:16])
+                if verbose_warn and os.path.lexists(dst_filepath):
                     say('warn', None, verbose,
                         f"File '{dst_filepath}' already exists- will overwrite. This should NOT have happened.")
                     
-                _save_bkp_file(src_filepath, dst_filepath, action='copy', dry_run=dry_run, compress=new_filedata['compr_mth'], verbose=verbose)
-                no_copy += new_filedata['no_f']
+                if dedup_index is not None and 'hash' in new_filedata:
+                    dedup_key = f"{new_compr_mth}:{new_filedata['hash']}"
+                    if dedup_key in dedup_index and _link_bkp_file(
+                            dedup_index[dedup_key], dst_filepath, dry_run=dry_run, verbose=verbose):
+                        no_copy += new_no_f
+                        continue
+                    
+                copy_args   = (src_filepath, dst_filepath)
+                copy_kwargs = {
+                    'action': 'copy', 'dry_run': dry_run, 'compress': new_compr_mth,
+                    'src_size': new_size, 'compresslevel': compresslevel, 'bufsize': bufsize,
+                    'verbose': verbose, 'return_hash': dedup_index is not None}
+                copy_tasks.append((
+                    copy_executor.submit(_save_bkp_file, *copy_args, **copy_kwargs), _save_bkp_file,
+                    copy_args, copy_kwargs, dedup_index is not None))
+                no_copy += new_no_f
                 
-            elif new_filedata['type'] in {'dir'}:
+            elif new_type in {'dir'}:
                 
-                if new_filedata['compr_mth'] in {'gztar'}:
+                if new_compr_mth in {'gztar'}:
                     # archive the entire dir
                     
                     dst_filepath_noext = _get_bkp_filename(
-                        f'{dst_filepath_base}', new_filedata['mtime_utc'], compress=False, verbose=verbose)
-                    if is_verbose(verbose, 'warn') and os.path.exists(f'{dst_filepath_noext}.tar.gz'):
+                        dst_filepath_base, new_mtime_utc, compress=False, verbose=verbose)
+                    if verbose_warn and os.path.exists(f'{dst_filepath_noext}.tar.gz'):
                         say('warn', None, verbose,
                             f"File '{dst_filepath_noext}.tar.gz' already exists- will overwrite. This should NOT have happened.")
                         
-                    if is_verbose(verbose, 'note'):
+                    if verbose_note:
                         say('note', None, verbose, f"Archiving folder '{src_filepath}' to '{dst_filepath_noext}.tar.gz'")
                     if not dry_run:
-                        shutil.make_archive(dst_filepath_noext, format='gztar', root_dir=src_path, base_dir=fname)
+                        tar_args   = (dst_filepath_noext, src_path, fname)
+                        tar_kwargs = {
+                            'compresslevel': 1 if compresslevel is None else compresslevel, 'bufsize': bufsize,
+                            'verbose': verbose}
+                        copy_tasks.append((
+                            copy_executor.submit(_make_gztar, *tar_args, **tar_kwargs), _make_gztar,
+                            tar_args, tar_kwargs, False))
                     no_tgz  += 1
                         
                 else:
@@ -398,27 +1324,47 @@ def _backup_sub(
                     dst_filepath = dst_filepath_base
                     
                     # create dst dir if non-existent
-                    if not (os.path.exists(dst_filepath) and os.path.isdir(dst_filepath)):
-                        if is_verbose(verbose, 'note'):
+                    #    (its parent dst_path always exists, as we go top-down- so no need for os.makedirs)
+                    if dry_run:
+                        if verbose_note and not os.path.isdir(dst_filepath):
                             say('note', None, verbose, f"Creating Directory '{dst_filepath}'")
-                        if not dry_run:
-                            os.makedirs(dst_filepath)
-                    if fname in old_filetree.keys():
-                        old_filedata = old_filetree[fname]
+                    else:
+                        try:
+                            os.mkdir(dst_filepath)
+                        except FileExistsError:
+                            # normally the dir from the last backup- but make sure it is not a file
+                            if verbose_fatal and not os.path.isdir(dst_filepath):
+                                raise NotADirectoryError(
+                                    f"Backup destination '{dst_filepath}' exists but is not a directory.")
+                        else:
+                            if verbose_note:
+                                say('note', None, verbose, f"Creating Directory '{dst_filepath}'")
                 
                     new_no_skip, new_no_copy, new_no_tgz, new_no_dir = _backup_sub(
                         src_filepath, dst_filepath,
                         new_filetree = new_filedata['sub_files'],
-                        old_filetree = old_filedata['sub_files'] if 'sub_files' in old_filedata.keys() else {},
+                        old_filetree = old_filedata.get('sub_files', {}),
                         filecmp_shallow = filecmp_shallow,
                         dry_run = dry_run,
                         verbose = verbose,
+                        dedup_index = dedup_index,
+                        compresslevel = compresslevel,
+                        bufsize = bufsize,
+                        use_processes = use_processes,
                     )
                     no_skip += new_no_skip
                     no_copy += new_no_copy
                     no_tgz  += new_no_tgz
                     no_dir  += new_no_dir
                     no_dir  += 1
+
+    # wait for the file copies & archives to finish
+    #    (only index them for dedup once they are written, so we never link to a half-written file;
+    #    and by the hash of the data actually written- src may have changed since it was scanned)
+    for future, copy_func, copy_args, copy_kwargs, index_dedup in copy_tasks:
+        written_hash = _result_or_run(future, copy_func, *copy_args, **copy_kwargs)
+        if index_dedup and written_hash is not None:
+            dedup_index[f"{copy_kwargs['compress']}:{written_hash}"] = copy_args[1]
     return no_skip, no_copy, no_tgz, no_dir
 
 
@@ -428,8 +1374,16 @@ def backup(
     dst_path    : str,
     src_filename: None|str = None,
     filecmp_shallow : bool = True,
-    gztar_list  : set[str]|list[str] = {'.git'},
-    ignore_list : set[str]|list[str] = {'__pycache__', '.ipynb_checkpoints'},
+    gztar_list  : frozenset[str]|set[str]|list[str] = DEFAULT_GZTAR_LIST,
+    ignore_list : frozenset[str]|set[str]|list[str] = DEFAULT_IGNORE_LIST,
+    compress    : str  = DEFAULT_COMPRESS,
+    compresslevel   : None|int = None,
+    bufsize     : int  = COPY_BUFSIZE,
+    use_processes   : bool = False,
+    hardlink_dedup  : bool = False,
+    parallel    : bool = True,
+    trust_dir_mtime : bool = False,
+    sort_by_inode   : bool = DEFAULT_SORT_BY_INODE,
     dry_run     : bool = False,
     log_lvl     : bool|int = logging.DEBUG,
     verbose     : int  = 4,
@@ -461,6 +1415,14 @@ def backup(
     filecmp_shallow: bool
         If True, will not compare src files and dst files (if exist) byte by byte;
             They will be considered true if they have the same size and modification time.
+        If False, will compare the content hash of src files to those recorded last time instead of mtime
+            (falls back to mtime if no hash was recorded).
+            Hashes are cached in '{dst_path}/_bkp_meta_/{src_filename}.hashcache.json',
+            so a file is only re-read if its inode, size, mtime or ctime changed.
+            (The cache trusts that content cannot change without changing one of these-
+            ctime cannot be set back by user programs, so in-place rewrites are caught.)
+            A file whose content changed but mtime did not is saved as '{name}.bkp{mtime}-{hash}...',
+            next to the earlier backup with the same mtime.
 
     gztar_list: list
         make an archive for folder names matching this list.
@@ -469,6 +1431,42 @@ def backup(
         Do not backup files/folders within this list at all.
         Only check this if src_path points to a folder.
 
+    compress: str
+        Compression method for backup files. 'zstd' (default, if zstandard is installed) or 'gzip'.
+
+    compresslevel: int | None
+        Compression level. If None, use the default of the compression method (gzip: 1, i.e. fastest; zstd: 3).
+
+    bufsize: int
+        Buffer size (in bytes) for reading / writing files when compressing.
+
+    use_processes: bool
+        If True, compress & save files with a pool of os.cpu_count() processes instead of threads.
+        Only helps if compression is bound by python code holding the GIL
+            (i.e. neither zstandard, isal, nor pigz is available)- otherwise threads are faster (no IPC).
+
+    hardlink_dedup: bool
+        If True, a file whose content (hash) is the same as an already backed-up file (from any src path or run)
+            will be backed up as a hard link to that backup file instead of a new copy.
+        The index of backed-up files is kept in '{dst_path}/_bkp_meta_/{src_filename}.dedupindex.json'.
+        Requires file hashes- see filecmp_shallow for the hash cache.
+
+    parallel: bool
+        Scan the source file tree in parallel with a thread pool. See get_filetree().
+
+    trust_dir_mtime: bool
+        If True, for dirs whose own mtime did not change since last backup,
+            do not re-read their entries, and (if filecmp_shallow and not hardlink_dedup) do not re-stat their files.
+        Much faster scan for huge trees, but
+        WARNING: FILES MODIFIED IN PLACE (WITHOUT ADDING / REMOVING / RENAMING FILES IN THEIR DIR) WILL BE MISSED.
+        Entries skipped in the last scan (e.g. permission errors since fixed) are also not re-checked
+            until their dir's mtime changes.
+        See old_filetree in get_filetree().
+
+    sort_by_inode: bool
+        Scan & back up the entries of each dir in inode order (roughly their order on disk).
+        Helps on spinning disks; harmless elsewhere (off by default on windows). See get_filetree().
+
     dry_run: bool
         Print what will be done (if verbose >= 3) instead of actually doing.
 
@@ -491,6 +1489,8 @@ def backup(
         src_filename = os.path.basename(src_path)
     dst_filepath = f'{dst_path}{sep}{src_filename}'
     metadata = {}
+    if compress in {'zstd'} and zstandard is None and is_verbose(verbose, LEVEL_FATAL):
+        raise ImportError("compress='zstd' requires the zstandard package.")
 
     
     top_timestamp_str = _get_timestamp_str(time.time())
@@ -498,17 +1498,20 @@ def backup(
         if isinstance(verbose, int):
             # create backup dir if not existing
             bkp_meta_dirpath = f"{dst_path}/_bkp_meta_"
-            if not (os.path.exists(bkp_meta_dirpath) and os.path.isdir(bkp_meta_dirpath)):
-                if is_verbose(verbose, 'warn'):
-                    say('warn', None, verbose, f"REGARDLESS OF {dry_run}, Creating Directory '{bkp_meta_dirpath}'")
+            try:
                 os.makedirs(bkp_meta_dirpath)
+            except FileExistsError:
+                pass
+            else:
+                if is_verbose(verbose, LEVEL_WARN):
+                    say('warn', None, verbose, f"REGARDLESS OF {dry_run}, Creating Directory '{bkp_meta_dirpath}'")
             # add auto logging
             log_filename = f"{dst_path}/_bkp_meta_/{src_filename}.filetree.bkp{top_timestamp_str}.log"
             with open(log_filename, 'a') as f:
                 pass
             logging.basicConfig(filename=log_filename, level=logging.DEBUG)
             verbose = (verbose, (None, logging.getLogger(__name__)))
-            if is_verbose(verbose, 'note'):
+            if is_verbose(verbose, LEVEL_NOTE):
                 say('note', None, verbose,
                     f"Logging to '{log_filename}',",
                     f"under {__name__=}.",
@@ -517,8 +1520,10 @@ def backup(
             raise TypeError(f"{type(verbose)= } should be int")
     
 
-    if is_verbose(verbose, 'note'):
+    if is_verbose(verbose, LEVEL_NOTE):
         python_time_start = _now()
+        # time used is measured with the monotonic clock- immune to system clock adjustments during the backup
+        perf_time_start = time.perf_counter()
         say('note', None, verbose,
             "\n\n",
             f"Beginning backup ({dry_run=})",
@@ -532,8 +1537,52 @@ def backup(
         )
 
     
+    # read hash cache
+    hash_cache = None
+    hash_cache_filename = f"{dst_path}/_bkp_meta_/{src_filename}.hashcache.json"
+    if not filecmp_shallow or hardlink_dedup:
+        hash_cache = {'old': {}, 'new': {}}
+        try:
+            with open(hash_cache_filename, 'rb') as f:
+                hash_cache['old'] = json_load(f, load_metadata=False)
+        except (JSONDecodeError, FileNotFoundError):
+            say('warn', None, verbose, "No valid file hash cache found. Will hash everything.")
+
+    # read old filetree (before scanning, so the scan can use it if trust_dir_mtime)
+    #    (gzip-ed; falls back to the uncompressed file from older versions)
+    latest_filetree_filename = f"{dst_path}/_bkp_meta_/{src_filename}.filetree.json.gz"
+    legacy_filetree_filename = f"{dst_path}/_bkp_meta_/{src_filename}.filetree.json"
+    if is_verbose(verbose, LEVEL_NOTE):
+        say('note', None, verbose,
+            f"Reading file tree data from '{latest_filetree_filename}'",
+            f"Note that you can delete that file to force the code to re-backup everything.",
+        )
+    old_filetree_filename = latest_filetree_filename    # the file actually read
+    try:
+        try:
+            with gzip.open(latest_filetree_filename, 'rb') as f:
+                old_filetree = json_load(f)
+        except FileNotFoundError:
+            old_filetree_filename = legacy_filetree_filename
+            with open(legacy_filetree_filename, 'rb') as f:
+                old_filetree = json_load(f)
+    except (JSONDecodeError, gzip.BadGzipFile, EOFError, zlib.error):
+        old_filetree = {}
+        say('err', None, verbose,
+            f"Corrupted old filetree data in '{old_filetree_filename}'.",
+            "Will ignore old file tree and backup EVERYTHING.")
+    except FileNotFoundError:
+        old_filetree = {}
+        say('warn', None, verbose, "No old filetree data found. Will create one.")
+    else:
+        say('note', None, verbose, f"Read old filetree data from '{old_filetree_filename}'.")
+    
+
     # scan the folder/file to get the filetree
-    ans = get_filetree(src_path, src_filename=src_filename, gztar_list=gztar_list, ignore_list=ignore_list)
+    ans = get_filetree(
+        src_path, src_filename=src_filename, gztar_list=gztar_list, ignore_list=ignore_list, compress=compress,
+        hash_cache=hash_cache, parallel=parallel,
+        old_filetree=old_filetree.get(src_filename), trust_dir_mtime=trust_dir_mtime, sort_by_inode=sort_by_inode)
     new_filetree = {ans[0]: ans[1]}
 
     no_files_total = ans[1]['no_f']
@@ -541,31 +1590,32 @@ def backup(
 
 
     # save new filetree
-    new_filetree_filename    = f"{dst_path}/_bkp_meta_/{src_filename}.filetree.bkp{top_timestamp_str}.json"
+    new_filetree_filename    = f"{dst_path}/_bkp_meta_/{src_filename}.filetree.bkp{top_timestamp_str}.json.gz"
     say('note', None, verbose, f"Writing file tree data to '{new_filetree_filename}'")
     if not dry_run:
-        with open(new_filetree_filename, 'w') as f:
+        # gzip-ed: the filetree is large and highly redundant
+        #    (binary mode: json_dump writes the orjson bytes as-is, no decode/encode round-trip)
+        with gzip.open(new_filetree_filename, 'wb', compresslevel=1) as f:
             json_dump(new_filetree, f, metadata)
+        if hash_cache is not None:
+            with open(hash_cache_filename, 'wb', buffering=1<<20) as f:
+                json_dump(hash_cache['new'], f, metadata)
+    # the hash cache (one entry per file, both old & new) is only needed for scanning-
+    #    release it before the backup, which keeps both filetrees in memory
+    hash_cache = None
 
     
-    # read old filetree
-    latest_filetree_filename = f"{dst_path}/_bkp_meta_/{src_filename}.filetree.json"
-    if is_verbose(verbose, 'note'):
-        say('note', None, verbose,
-            f"Reading file tree data from '{latest_filetree_filename}'",
-            f"Note that you can delete that file to force the code to re-backup everything.",
-        )
-    try:
-        with open(latest_filetree_filename, 'r') as f:
-            old_filetree = json_load(f)
-    except JSONDecodeError:
-        old_filetree = {}
-        say('err', None, verbose, "Corrupted old filetree data. Will ignore old file tree and backup EVERYTHING.")
-    except FileNotFoundError:
-        old_filetree = {}
-        say('warn', None, verbose, "No old filetree data found. Will create one.")
-    else:
-        say('note', None, verbose, f"Read old filetree data from '{latest_filetree_filename}'.")
+
+    # read dedup index
+    dedup_index = None
+    dedup_index_filename = f"{dst_path}/_bkp_meta_/{src_filename}.dedupindex.json"
+    if hardlink_dedup:
+        dedup_index = {}
+        try:
+            with open(dedup_index_filename, 'rb') as f:
+                dedup_index = json_load(f, load_metadata=False)
+        except (JSONDecodeError, FileNotFoundError):
+            say('warn', None, verbose, "No valid dedup index found. Will create one.")
     
 
     # normalize filetrees for backup comparison
@@ -577,20 +1627,28 @@ def backup(
     #    key = [k for k in old_filetree.keys()][0]
     #    if 'sub_files' in old_filetree[key].keys():
     #        old_filetree_dict = old_filetree[key]['sub_files']
-    elif is_verbose(verbose, 'warn'):
+    elif is_verbose(verbose, LEVEL_WARN):
         say('warn', None, verbose, "No valid old filetree data found. Will backup EVERYTHING.")
 
 
     # create backup dir if not existing
-    if not (os.path.exists(dst_filepath) and os.path.isdir(dst_filepath)):
-        say('note', None, verbose, f"Creating Directory '{dst_filepath}'")
-        if not dry_run:
+    if dry_run:
+        if not os.path.isdir(dst_filepath):
+            say('note', None, verbose, f"Creating Directory '{dst_filepath}'")
+    else:
+        try:
             os.makedirs(dst_filepath)
+        except FileExistsError:
+            # normally the dir from the last backup- but make sure it is not a file
+            if not os.path.isdir(dst_filepath) and is_verbose(verbose, LEVEL_FATAL):
+                raise NotADirectoryError(f"Backup destination '{dst_filepath}' exists but is not a directory.")
+        else:
+            say('note', None, verbose, f"Creating Directory '{dst_filepath}'")
 
-    if is_verbose(verbose, 'note'):
+    if is_verbose(verbose, LEVEL_NOTE):
         say('note', None, verbose, "Filetree read complete.")
         python_time_ended = _now()
-        python_time__used  = python_time_ended - python_time_start
+        python_time__used  = timedelta(seconds=time.perf_counter() - perf_time_start)
         say('note', None, verbose, "\n", f"Now  : {python_time_ended.isoformat()}", f"Time Used: {python_time__used}\n")
         say('note', None, verbose, f"\n\n\tBeginning backup...\n\n")
         
@@ -603,6 +1661,10 @@ def backup(
         filecmp_shallow = filecmp_shallow,
         dry_run = dry_run,
         verbose = verbose,
+        dedup_index = dedup_index,
+        compresslevel = compresslevel,
+        bufsize = bufsize,
+        use_processes = use_processes,
     )
     no_dir += 1 # counting itself
     say('note', None, verbose,
@@ -618,14 +1680,34 @@ def backup(
 
     # update filetree
     if not dry_run:
+        if dedup_index is not None:
+            with open(dedup_index_filename, 'wb', buffering=1<<20) as f:
+                json_dump(dedup_index, f, metadata=None)
         say('note', None, verbose, f"Overwriting file tree data from '{new_filetree_filename}' to '{latest_filetree_filename}'")
-        shutil.copy2(new_filetree_filename, latest_filetree_filename)
+        # hard-link + atomic rename instead of copying the data
+        #    (falls back to copying if hard links are not supported)
+        tmp_filetree_filename = f"{latest_filetree_filename}.tmp"
+        try:
+            # remove any tmp left over from an interrupted run
+            os.remove(tmp_filetree_filename)
+        except FileNotFoundError:
+            pass
+        try:
+            os.link(new_filetree_filename, tmp_filetree_filename)
+            try:
+                os.replace(tmp_filetree_filename, latest_filetree_filename)
+            finally:
+                # only still there if the replace failed
+                if os.path.lexists(tmp_filetree_filename):
+                    os.remove(tmp_filetree_filename)
+        except OSError:
+            shutil.copy2(new_filetree_filename, latest_filetree_filename)
         
 
     # record time used
-    if is_verbose(verbose, 'note'):
+    if is_verbose(verbose, LEVEL_NOTE):
         python_time_ended = _now()
-        python_time__used  = python_time_ended - python_time_start
+        python_time__used  = timedelta(seconds=time.perf_counter() - perf_time_start)
         say('note', None, verbose, "\n", f"Ended: {python_time_ended.isoformat()}", f"Time Used: {python_time__used}\n")
         say('note', None, verbose, f"\n\n\n\t\t--- All done ---\n\n\n")
 
@@ -13,7 +13,7 @@ Owner: Chunliang Mu
 
 
 #  import (my libs)
-from ..log import say, is_verbose
+from ..log import say, is_verbose, LEVEL_FATAL, LEVEL_WARN
 
 
 #  import (general)
@@ -77,7 +77,7 @@ def get_str_from_astropyUnit(unit: units.Unit) -> str:
 def get_compress_mode_from_filename(filename: str, verbose: int = 3) -> str|bool:
     """Get the compress mode."""
     if not isinstance(filename, str):
-        if is_verbose(verbose, 'fatal'):
+        if is_verbose(verbose, LEVEL_FATAL):
             raise TypeError(f"Input filename should be of type str, but is of type {type(filename)=}.")
         return False
     _, ext = os.path.splitext(filename)
@@ -87,7 +87,7 @@ def get_compress_mode_from_filename(filename: str, verbose: int = 3) -> str|bool
     elif ext in {'.hdf5', '.json'}:
         return False
     # fallback option
-    elif is_verbose(verbose, 'warn'):
+    elif is_verbose(verbose, LEVEL_WARN):
         say('warn', None, verbose,
             f"Unrecognized file extension {ext}. Proceeding without compression.")
         return False
@@ -26,6 +26,12 @@ import numpy as np
 from astropy import units
 import io
 
+#  import (optional, faster json)
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
 
 
 
@@ -283,6 +289,7 @@ def json_dump(
 
     fp: io.BufferedReader:
         File object you get with open(), with write permission.
+        Either text or binary mode; binary skips a decode/encode round-trip when orjson is installed.
         
     metadata: dict | None
         meta data to be added to file. The code will also save some of its own metadata.
@@ -302,6 +309,7 @@ def json_dump(
         
     indent: int | None
         indentation in the saved json files.
+        If orjson is installed, it will be used instead for speed, and any non-None indent becomes 2.
         
     verbose: int
         How much erros, warnings, notes, and debug info to be print on screen.
@@ -310,6 +318,17 @@ def json_dump(
         obj, metadata=metadata,
         overwrite_obj=overwrite_obj, overwrite_obj_kwds=overwrite_obj_kwds,
         ignore_unknown_types=ignore_unknown_types, verbose=verbose,)
+    if _orjson is not None:
+        option = _orjson.OPT_NON_STR_KEYS
+        if indent is not None:
+            option |= _orjson.OPT_INDENT_2
+        data = _orjson.dumps(obj, option=option)
+        fp.write(data.decode() if isinstance(fp, io.TextIOBase) else data)
+        return
+    if not isinstance(fp, io.TextIOBase):
+        # binary fp: encode once here so the caller need not wrap it in a text layer
+        fp.write(json.dumps( obj, indent=indent, ).encode())
+        return
     return json.dump( obj, fp, indent=indent, )
 
 
@@ -338,5 +357,7 @@ def json_load(
     """
     if remove_metadata is not None:    # backward-compatibility term
         load_metadata = not remove_metadata
-    return _json_decode( json.load(fp), overwrite_obj=True, load_metadata=load_metadata, verbose=verbose, )
+    # note: orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+    obj = _orjson.loads(fp.read()) if _orjson is not None else json.load(fp)
+    return _json_decode( obj, overwrite_obj=True, load_metadata=load_metadata, verbose=verbose, )
 
@@ -7,9 +7,11 @@ A sub-module for warning / error reporting / messaging things.
 Owner: Chunliang Mu
 """
 
-import inspect
+import sys
+import atexit
 #from typing import TextIO
 import logging
+import threading
 from logging import Logger # type
 
 # define the type of the verbose param
@@ -21,9 +23,27 @@ VerboseOutsType_pure = set | list | tuple    # without generalization
 VerboseType    = bool|int | tuple[bool|int, VerboseOutsType]
 NumberType     = int |float
 
+# the same as tuples of types, for isinstance() in hot paths (faster than the unions above; no union built per call)
+_NUMBER_TYPES      : tuple[type, ...] = (int, float)
+_TUPLE_OR_LIST     : tuple[type, ...] = (tuple, list)
+_VERBOSE_OUTS_TYPES: tuple[type, ...] = (set, list, tuple)
+
+# default output of say() (print only)- shared, so no new set per call
+_DEFAULT_VERBOSE_OUTS: frozenset[VerboseOutType] = frozenset({None})
+
 # set default value of verboseness
 DEFAULT_VERBOSE: int|bool = 3
 
+# so that messages from different threads do not get mixed up
+_SAY_LOCK = threading.Lock()
+
+# buffer messages printed by say() & write them out in batches of ~SAY_BUFFER_SIZE chars- fewer writes for heavy logging
+#    off by default so that messages show up in real time. Flushed at exit.
+SAY_BUFFERED   : bool = False
+SAY_BUFFER_SIZE: int  = 8192
+_say_buffer: list[str] = []
+_say_buffer_len: int = 0
+
 # translating the verbose_req from adhoc to normalized version
 _VERBOSEREQDICT_TO_STR: dict[str, str] = {
     # Note: _VERBOSEREQDICT_TO_STR.values() must all be in keys()
@@ -52,15 +72,25 @@ _VERBOSEREQDICT_TO_STR: dict[str, str] = {
     'Debug'     : 'debug',
 }
 
+# int verbose_req of each level
+#    pass these to is_verbose() / say(verbose_req=...) instead of the str names to skip translating them
+LEVEL_NONE : None = None
+LEVEL_FATAL: int  = 0
+LEVEL_ERR  : int  = 1
+LEVEL_WARN : int  = 2
+LEVEL_NOTE : int  = 3
+LEVEL_INFO : int  = 4
+LEVEL_DEBUG: int  = 5
+
 # translating the verbose_req from normalized to int
 _VERBOSEREQDICT_STR_TO_INT: dict[str, None|int] = {
-    'None' : None,
-    'fatal': 0,
-    'err'  : 1,
-    'warn' : 2,
-    'note' : 3,
-    'info' : 4,
-    'debug': 5,
+    'None' : LEVEL_NONE,
+    'fatal': LEVEL_FATAL,
+    'err'  : LEVEL_ERR,
+    'warn' : LEVEL_WARN,
+    'note' : LEVEL_NOTE,
+    'info' : LEVEL_INFO,
+    'debug': LEVEL_DEBUG,
 }
 
 # translating the verbose_req from adhoc to int
@@ -84,6 +114,40 @@ _VERBOSEREQDICT_TO_LOGGING_LEVEL = {
     req_user: _VERBOSEREQDICT_TO_LOGGING_LEVEL[req_norm]  for req_user, req_norm in _VERBOSEREQDICT_TO_STR.items()
 }
 
+# header of the message for each level in say()
+_VERBOSEREQDICT_TO_HEADER: dict[str, str] = {
+    'fatal': "*** Fatal  :",
+    'err'  : "*** Error  :",
+    'warn' : "**  Warning:",
+    'note' : "*   Note   :",
+    'info' : "    Debug  :",
+    'debug': "    Debug  :",
+}
+_VERBOSEREQDICT_TO_HEADER = {
+    req_user: _VERBOSEREQDICT_TO_HEADER[req_norm]
+    for req_user, req_norm in _VERBOSEREQDICT_TO_STR.items() if req_norm in _VERBOSEREQDICT_TO_HEADER
+}
+
+
+
+
+
+
+def _write_say_buffer():
+    """Write out the messages buffered by say(). Call with _SAY_LOCK held."""
+    global _say_buffer_len
+    if _say_buffer:
+        sys.stdout.write(''.join(_say_buffer))
+        sys.stdout.flush()
+        _say_buffer.clear()
+        _say_buffer_len = 0
+
+
+@atexit.register
+def flush_say():
+    """Write out the messages buffered by say() (if SAY_BUFFERED)."""
+    with _SAY_LOCK:
+        _write_say_buffer()
 
 
 
@@ -95,25 +159,28 @@ def is_verbose(
 ) -> bool:
     """Test if we should be verbose.
 
+    verbose_req as int (e.g. LEVEL_NOTE) is the fastest.
     Accepted verbose_req input as str: (None or int are always okay)
         1: 'error' or 'err'
         2: 'warn'
         3: 'note'
         4: 'info' or 'debug_info'
     """
-    if   isinstance(verbose_req, NumberType) and isinstance(verbose, NumberType):
-        return verbose >= verbose_req
-    elif verbose_req is None or isinstance(verbose, bool):
-        return verbose
-    elif isinstance(verbose, tuple|list):
-        return is_verbose(verbose[0], verbose_req)
-    elif isinstance(verbose_req, str):
-        if verbose_req in _VERBOSEREQDICT_TO_INT.keys():
-            return is_verbose(verbose, _VERBOSEREQDICT_TO_INT[verbose_req])
+    # loop instead of recursion: unwrap verbose / translate verbose_req, until they can be compared
+    while True:
+        if   isinstance(verbose_req, _NUMBER_TYPES) and isinstance(verbose, _NUMBER_TYPES):
+            return verbose >= verbose_req
+        elif verbose_req is None or isinstance(verbose, bool):
+            return verbose
+        elif isinstance(verbose, _TUPLE_OR_LIST):
+            verbose = verbose[0]
+        elif isinstance(verbose_req, str):
+            if verbose_req in _VERBOSEREQDICT_TO_INT.keys():
+                verbose_req = _VERBOSEREQDICT_TO_INT[verbose_req]
+            else:
+                raise ValueError(f"Unrecognized {verbose_req= }")
         else:
-            raise ValueError(f"Unrecognized {verbose_req= }")
-
-    raise TypeError(f"Unrecognized {verbose= } or {verbose_req= }")
+            raise TypeError(f"Unrecognized {verbose= } or {verbose_req= }")
         
     
 
@@ -170,51 +237,70 @@ def say(
     verbose_req: int
         Required minimum verbose to do anything.
         If 'None' (as str), will treat verbose as a bool and print even if verbose < 0 !
+
+    Returns
+    -------
+    msgs_txt: str
+        The full message said, or '' if not verbose enough (nothing said).
     """
     if verbose_req is None:
         verbose_req = level
     elif verbose_req in {'None'}:
         verbose_req = None
 
+    # nothing to do- skip building the message
+    #    fast path for the common case of a plain int verbose & a level name: compare right here
+    verbose_req_int = None
+    if type(verbose) is int and type(verbose_req) is str:
+        verbose_req_int = _VERBOSEREQDICT_TO_INT.get(verbose_req)
+    if verbose_req_int is not None:
+        if verbose < verbose_req_int:
+            return ''
+    elif not is_verbose(verbose, verbose_req):
+        return ''
+
     # decide orig
     if orig is None:
         orig = 3
     if isinstance(orig, int):
-        orig = '() ==> '.join([info.function for info in inspect.stack()][1:orig+1][::-1]) + '()'
-
-
-    # normalize level
-    level = _VERBOSEREQDICT_TO_STR[level]
-    # get message
-    if   level in {'fatal'}:
-        msgs_txt = "*** Fatal  :"
-    elif level in {'err'}:
-        msgs_txt = "*** Error  :"
-    elif level in {'warn'}:
-        msgs_txt = "**  Warning:"
-    elif level in {'note'}:
-        msgs_txt = "*   Note   :"
-    elif level in {'info', 'debug'}:
-        msgs_txt = "    Debug  :"
-    else:
-        raise ValueError
-    msgs_txt += f"    {orig}:\n\t"
-    msgs_txt += sep.join(msgs)
-
-    if is_verbose(verbose, verbose_req):
-        # find output
-        verbose_outs = {None,}
-        if isinstance(verbose, tuple|list) and len(verbose) >= 2 and isinstance(verbose[1], VerboseOutsType_pure):
-            verbose_outs = verbose[1]
-
+        # walk up the frames directly- inspect.stack() would also look up source code for every frame
+        frame = sys._getframe(1)
+        orig_names = []
+        for _ in range(orig):
+            if frame is None:
+                break
+            orig_names.append(frame.f_code.co_name)
+            frame = frame.f_back
+        orig = '() ==> '.join(orig_names[::-1]) + '()'
+
+
+    # get message (in one go- no intermediate strs)
+    try:
+        header = _VERBOSEREQDICT_TO_HEADER[level]
+    except KeyError:
+        raise ValueError(f"Unrecognized {level= }") from None
+    msgs_txt = f"{header}    {orig}:\n\t{sep.join(msgs)}"
+
+    # find output
+    verbose_outs = _DEFAULT_VERBOSE_OUTS
+    if isinstance(verbose, _TUPLE_OR_LIST) and len(verbose) >= 2 and isinstance(verbose[1], _VERBOSE_OUTS_TYPES):
+        verbose_outs = verbose[1]
+
+    global _say_buffer_len
+    with _SAY_LOCK:
         for verbose_out in verbose_outs:
-            if verbose_out is None:
+            if verbose_out is None and SAY_BUFFERED:
+                _say_buffer.append(msgs_txt)
+                _say_buffer.append(end)
+                _say_buffer_len += len(msgs_txt) + len(end)
+                if _say_buffer_len >= SAY_BUFFER_SIZE:
+                    _write_say_buffer()
+            elif verbose_out is None:
                 print(msgs_txt, end=end)
             elif isinstance(verbose_out, Logger):
                 verbose_out.log(_VERBOSEREQDICT_TO_LOGGING_LEVEL[level], msgs_txt)
             else:
                 raise TypeError(f"Invalid {type(verbose_out)= }")
-            
         
     return msgs_txt
 